@@ -1,56 +1,90 @@
 """Study Buddy Bot - Main entry point with Gradio UI."""
 
+import importlib.util
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import gradio as gr
 
-from config import TOP_K_RETRIEVAL, CHROMA_DB_PATH, SPACY_MODEL
+from config import (
+    TOP_K_RETRIEVAL,
+    SPACY_MODEL,
+    VECTOR_STORE_SENTINEL,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_THRESHOLD,
+)
 
 
 def _ensure_setup():
     """Auto-setup for HuggingFace Spaces: download spaCy model + build vector store."""
-    # Download spaCy model if not installed
-    try:
-        import spacy
-        spacy.load(SPACY_MODEL)
-    except OSError:
+    # Download spaCy model if not installed (checked without importing spaCy)
+    if importlib.util.find_spec(SPACY_MODEL) is None:
         print(f"Downloading spaCy model '{SPACY_MODEL}'...")
         subprocess.check_call([sys.executable, "-m", "spacy", "download", SPACY_MODEL])
 
-    # Build vector store if it doesn't exist
-    if not CHROMA_DB_PATH.exists() or not any(CHROMA_DB_PATH.iterdir()):
+    # Build vector store if it hasn't been built yet
+    if not VECTOR_STORE_SENTINEL.exists():
         print("Building vector store (first run)...")
         subprocess.check_call([sys.executable, str(Path(__file__).parent / "scripts" / "build_vector_store.py")])
 
 
 _ensure_setup()
 
-from modules.preprocessor import initialize as init_nltk
 from modules.intent_classifier import IntentClassifier
 from modules.knowledge_retrieval import KnowledgeBase
 from modules.response_generator import ResponseGenerator
 from modules.student_model import StudentModel
 from modules.adaptive_controller import AdaptiveController
+from modules.response_cache import ResponseCache
 
 
 class StudyBuddyBot:
     def __init__(self):
         print("Initializing Study Buddy Bot...")
-        init_nltk()
-        self.classifier = IntentClassifier()
-        self.kb = KnowledgeBase()
-        self.generator = ResponseGenerator()
         self.student = StudentModel()
         self.controller = AdaptiveController(self.student)
-        self._asked_ids: list[str] = []
-        print("Study Buddy Bot ready!")
+        self._asked_ids: set[str] = set()
+        self._explain_cache = ResponseCache(RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_SIZE)
+
+        # Models load in the background so the UI can render immediately
+        self._ready = threading.Event()
+        self._load_error: Exception | None = None
+        threading.Thread(target=self._load_models, daemon=True).start()
+
+    def _load_models(self):
+        """Load the NLP models; chat() waits until this has finished."""
+        try:
+            # The components are independent, so load them concurrently
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                f_classifier = executor.submit(IntentClassifier)
+                f_kb = executor.submit(KnowledgeBase)
+                f_generator = executor.submit(ResponseGenerator)
+            self.classifier = f_classifier.result()
+            self.kb = f_kb.result()
+            self.generator = f_generator.result()
+            # Loaded concurrently, so the shared embedder is wired up afterwards
+            self.generator.embedder = self.kb.embedder
+            print("Study Buddy Bot ready!")
+        except Exception as e:
+            self._load_error = e
+            raise
+        finally:
+            self._ready.set()
+
+    def _wait_until_ready(self):
+        """Block until the models are loaded, re-raising any load failure."""
+        self._ready.wait()
+        if self._load_error is not None:
+            raise RuntimeError("Study Buddy Bot failed to initialize") from self._load_error
 
     def chat(self, user_message: str, history: list[dict]) -> tuple[list[dict], str]:
         """Main conversation handler called by Gradio."""
         if not user_message.strip():
             return history, ""
+        self._wait_until_ready()
 
         # Add user message to history
         history = history + [{"role": "user", "content": user_message}]
@@ -96,7 +130,7 @@ class StudyBuddyBot:
             return "I've run out of questions! Great job working through them all. Try asking me to explain a concept instead."
 
         self.student.set_current_quiz(question)
-        self._asked_ids.append(question["quiz_id"])
+        self._asked_ids.add(question["quiz_id"])
         return self.generator.format_quiz_question(question)
 
     def _handle_answer(self, user_answer: str) -> str:
@@ -110,6 +144,7 @@ class StudyBuddyBot:
         topic = quiz["topic"]
         difficulty = quiz["difficulty"]
 
+        result = None
         # For multiple choice, do simple letter matching first
         if quiz.get("question_type") == "multiple_choice":
             user_letter = user_answer.strip().upper()
@@ -121,14 +156,18 @@ class StudyBuddyBot:
                     "explanation": explanation,
                     "score": 1.0 if is_correct else 0.0,
                 }
-            else:
-                # Use LLM evaluation for longer answers to MC questions
-                context = self._get_context(question_text, topic)
-                result = self.generator.evaluate_answer(question_text, correct_answer, user_answer, context)
-        else:
-            # Short answer / code output: use LLM evaluation
-            context = self._get_context(question_text, topic)
-            result = self.generator.evaluate_answer(question_text, correct_answer, user_answer, context)
+
+        if result is None:
+            # Exact or near-exact answers skip retrieval and the LLM entirely
+            result = self.generator.match_answer(correct_answer, user_answer, quiz.get("question_type"))
+
+        if result is None:
+            # Longer MC answers / short answer / code output: use LLM evaluation
+            # (no retrieval needed; grading never reads the context)
+            result = self.generator.evaluate_answer(
+                question_text, correct_answer, user_answer, [],
+                question_type=quiz.get("question_type"),
+            )
 
         # Record result
         hints_used = self.student.hint_count
@@ -171,19 +210,27 @@ class StudyBuddyBot:
         if hint_key in quiz and quiz[hint_key]:
             return f"**Hint (level {hint_level}/3):** {quiz[hint_key]}"
 
-        # Fallback to LLM-generated hint
-        context = self._get_context(quiz["question"], quiz["topic"])
+        # Fallback to rule-based hint (no retrieval needed; it ignores context)
         hint = self.generator.generate_hint(
-            quiz["question"], quiz["correct_answer"], hint_level, context
+            quiz["question"], quiz["correct_answer"], hint_level, []
         )
         return f"**Hint (level {hint_level}/3):** {hint}"
 
     def _handle_explain(self, query: str, topic: str = None) -> str:
         """Retrieve context and generate an explanation."""
+        # Near-duplicate questions on the same topic reuse the earlier explanation
+        embedding = self.kb.embed_query(query)
+        cache_kind = f"explain:{topic}"
+        cached = self._explain_cache.get(embedding, cache_kind)
+        if cached is not None:
+            return cached
+
         where = {"topic": topic} if topic else None
         results = self.kb.query(query, "tutorial_chunks", n_results=TOP_K_RETRIEVAL, where_filter=where)
         context_chunks = [r["content"] for r in results]
-        return self.generator.generate_explanation(topic or "general", query, context_chunks)
+        response = self.generator.generate_explanation(topic or "general", query, context_chunks)
+        self._explain_cache.put(embedding, cache_kind, response)
+        return response
 
     def _handle_progress(self) -> str:
         """Show the student's progress."""
@@ -224,7 +271,7 @@ def create_interface() -> gr.Blocks:
         gr.Markdown("# Study Buddy Bot\n*Your Python tutoring assistant*")
 
         chatbot = gr.Chatbot(
-            value=[{"role": "assistant", "content": bot.generator.generate_greeting()}],
+            value=[{"role": "assistant", "content": ResponseGenerator.generate_greeting()}],
             height=500,
             type="messages",
         )
@@ -7,17 +7,38 @@ KNOWLEDGE_DIR = PROJECT_ROOT / "knowledge"
 QUIZ_QUESTIONS_PATH = DATA_DIR / "quiz_questions.json"
 TUTORIAL_CHUNKS_PATH = DATA_DIR / "python_tutorial_chunks.json"
 CHROMA_DB_PATH = KNOWLEDGE_DIR / "chroma_db"
+GENERATOR_ONNX_DIR = KNOWLEDGE_DIR / "flan-t5-base-onnx"  # cached ONNX export
+VECTOR_STORE_SENTINEL = CHROMA_DB_PATH / ".built"  # written once the store is fully built
 
 # Models
 HF_MODEL_NAME = "google/flan-t5-base"
+GENERATOR_BACKEND = "torch"  # "torch" (INT8) or opt-in "onnx" (FP32 ONNX Runtime export)
+USE_INT8 = True  # dynamic INT8 quantization of the generator's Linear layers (torch backend)
+USE_TORCH_COMPILE = False  # torch.compile the generator's forward pass (torch backend, slow startup)
+# Opt-in: the Gradio UI runs one handler at a time, so there is rarely anything
+# to batch, and INT8 activation scales make outputs depend on batch-mates
+GENERATION_BATCHING = False  # ignored on the INT8 torch backend
+GENERATION_MAX_BATCH = 8  # concurrent generate requests coalesced into one model call
+GENERATION_BATCH_WINDOW_MS = 10  # how long a batch waits for others once requests are queued
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = "onnx"  # "onnx" (int8 ONNX Runtime) or "torch"
+EMBEDDING_ONNX_FILE = "onnx/model_qint8_avx512_vnni.onnx"  # pre-quantized file in the model repo
+EMBEDDING_BATCH_SIZE = 128  # documents per encoder forward pass when building the store
 SPACY_MODEL = "en_core_web_sm"
 
 # RAG settings
 TOP_K_RETRIEVAL = 3
+QUERY_EMBEDDING_CACHE_SIZE = 512  # exact (normalized text) query embedding cache
+RETRIEVAL_CACHE_SIZE = 256  # semantic cache of retrieval results, per collection/filter
+RETRIEVAL_CACHE_THRESHOLD = 0.95  # cosine similarity needed to reuse cached results
+
+# Response cache settings
+RESPONSE_CACHE_SIZE = 256  # cached explanations per topic
+RESPONSE_CACHE_THRESHOLD = 0.93  # cosine similarity needed to reuse an explanation
 
 # Topics
 TOPICS = ["variables", "data_types", "control_structures", "functions", "lists"]
+TOPIC_LABELS = {t: t.replace("_", " ").title() for t in TOPICS}  # display names
 DIFFICULTY_LEVELS = ["beginner", "intermediate", "advanced"]
 
 # Adaptive controller thresholds
@@ -25,5 +46,13 @@ ACCURACY_PROMOTE_THRESHOLD = 0.8
 ACCURACY_DEMOTE_THRESHOLD = 0.4
 MIN_ATTEMPTS_FOR_ADJUSTMENT = 3
 
+# Answer evaluation: typo tolerance for short word answers (skips the LLM)
+ANSWER_FUZZY_MAX_LENGTH = 30
+ANSWER_FUZZY_THRESHOLD = 0.92
+# Embedding similarity between student and correct answer: accept (word answers
+# only) above ANSWER_SIM_ACCEPT, reject at or below ANSWER_SIM_REJECT, LLM between
+ANSWER_SIM_ACCEPT = 0.75
+ANSWER_SIM_REJECT = 0.55
+
 # Intent labels
 INTENTS = ["quiz", "hint", "explain", "answer", "progress", "greeting", "farewell", "off_topic"]
@@ -6,23 +6,28 @@ from config import (
     MIN_ATTEMPTS_FOR_ADJUSTMENT,
     DIFFICULTY_LEVELS,
     TOPICS,
+    TOPIC_LABELS,
 )
 from modules.student_model import StudentModel
 
 
+_LEVEL_IDX = {level: i for i, level in enumerate(DIFFICULTY_LEVELS)}
+_LAST_IDX = len(DIFFICULTY_LEVELS) - 1
+
+
 def _promote(level: str) -> str:
-    idx = DIFFICULTY_LEVELS.index(level)
-    return DIFFICULTY_LEVELS[min(idx + 1, len(DIFFICULTY_LEVELS) - 1)]
+    return DIFFICULTY_LEVELS[min(_LEVEL_IDX[level] + 1, _LAST_IDX)]
 
 
 def _demote(level: str) -> str:
-    idx = DIFFICULTY_LEVELS.index(level)
-    return DIFFICULTY_LEVELS[max(idx - 1, 0)]
+    return DIFFICULTY_LEVELS[max(_LEVEL_IDX[level] - 1, 0)]
 
 
 class AdaptiveController:
     def __init__(self, student: StudentModel):
         self.student = student
+        # (len(session_history), feedback) — history is append-only
+        self._feedback_cache: tuple[int, str] | None = None
 
     def get_recommended_difficulty(self, topic: str) -> str:
         """Determine the difficulty for the next question on this topic."""
@@ -81,19 +86,19 @@ class AdaptiveController:
 
     def get_session_feedback(self) -> str:
         """Generate end-of-session feedback."""
-        lines = []
-        strong = []
-        weak = []
-        for topic in TOPICS:
-            stats = self.student.get_topic_stats(topic)
-            if stats["attempted"] == 0:
-                continue
-            name = topic.replace("_", " ").title()
-            if stats["accuracy"] >= ACCURACY_PROMOTE_THRESHOLD:
-                strong.append(name)
-            elif stats["accuracy"] <= ACCURACY_DEMOTE_THRESHOLD:
-                weak.append(name)
+        n_answers = len(self.student.session_history)
+        if self._feedback_cache is not None and self._feedback_cache[0] == n_answers:
+            return self._feedback_cache[1]
+
+        accuracies = [
+            (TOPIC_LABELS[topic], self.student.topics[topic].accuracy)
+            for topic in TOPICS
+            if self.student.topics[topic].attempted > 0
+        ]
+        strong = [name for name, acc in accuracies if acc >= ACCURACY_PROMOTE_THRESHOLD]
+        weak = [name for name, acc in accuracies if acc <= ACCURACY_DEMOTE_THRESHOLD]
 
+        lines = []
         if strong:
             lines.append(f"Great work on: {', '.join(strong)}!")
         if weak:
@@ -101,4 +106,6 @@ class AdaptiveController:
         if not strong and not weak:
             lines.append("Keep practicing to build your Python skills!")
 
-        return " ".join(lines)
+        feedback = " ".join(lines)
+        self._feedback_cache = (n_answers, feedback)
+        return feedback
@@ -1,5 +1,6 @@
 """spaCy-based intent classification for the Study Buddy Bot."""
 
+import functools
 import re
 
 import spacy
@@ -41,6 +42,9 @@ _INTENT_PHRASES = {
     ],
 }
 
+# Ties between equally good matches go to the intent declared first
+_INTENT_PRIORITY = {intent: i for i, intent in enumerate(_INTENT_PHRASES)}
+
 # Topic synonyms for detection
 _TOPIC_SYNONYMS = {
     "variables": ["variable", "variables", "var", "assignment", "assign"],
@@ -63,6 +67,23 @@ _TOPIC_SYNONYMS = {
     ],
 }
 
+# Flattened synonym -> (priority, topic) index so extract_topic() needs one
+# dict lookup per word n-gram. Earlier topics take priority, matching the
+# declaration order of _TOPIC_SYNONYMS.
+_TOPIC_PHRASES: dict[str, tuple[int, str]] = {}
+for _priority, (_topic, _synonyms) in enumerate(_TOPIC_SYNONYMS.items()):
+    for _synonym in _synonyms:
+        _TOPIC_PHRASES.setdefault(_synonym, (_priority, _topic))
+_MAX_TOPIC_PHRASE_WORDS = max(len(phrase.split()) for phrase in _TOPIC_PHRASES)
+
+# Precompiled once; strips Unicode punctuation (curly quotes included) but
+# keeps "_" (data_types)
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+# Classification only needs the tokenizer (PhraseMatcher matches on LOWER),
+# so the statistical pipeline components are never loaded.
+_UNUSED_PIPES = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
 
 # Broad Python keywords — allows free-form questions like "tell me about dicts"
 # to pass through to RAG search even when they don't match one of the 5 quiz topics.
@@ -85,40 +106,38 @@ _PYTHON_KEYWORDS = {
 
 class IntentClassifier:
     def __init__(self):
-        self.nlp = spacy.load(SPACY_MODEL)
-        self._matchers: dict[str, PhraseMatcher] = {}
+        self.nlp = spacy.load(SPACY_MODEL, exclude=_UNUSED_PIPES)
+        self._make_doc_cached = functools.lru_cache(maxsize=256)(self.nlp.make_doc)
+        self._matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
         self._setup_matchers()
 
     def _setup_matchers(self):
-        """Create a PhraseMatcher for each intent."""
+        """Register each intent's phrases under its own label in one PhraseMatcher."""
         for intent, phrases in _INTENT_PHRASES.items():
-            matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
             patterns = [self.nlp.make_doc(phrase) for phrase in phrases]
-            matcher.add(intent, patterns)
-            self._matchers[intent] = matcher
+            self._matcher.add(intent, patterns)
 
     def classify(self, text: str, quiz_pending: bool = False) -> dict:
         """Classify user intent from text.
 
         Returns: {"intent": str, "confidence": float, "topic_mentioned": str|None}
         """
-        doc = self.nlp(text)
         text_lower = text.lower().strip()
+        doc = self._make_doc_cached(text_lower)
 
-        # Check each intent matcher, track best match
+        # Match all intents in one pass, track best match
         best_intent = None
         best_score = 0
 
-        for intent, matcher in self._matchers.items():
-            matches = matcher(doc)
-            if matches:
-                # Score by how much of the input the match covers
-                for match_id, start, end in matches:
-                    span_len = end - start
-                    score = span_len / len(doc) if len(doc) > 0 else 0
-                    if score > best_score:
-                        best_score = score
-                        best_intent = intent
+        for match_id, start, end in self._matcher(doc):
+            intent = self.nlp.vocab.strings[match_id]
+            # Score by how much of the input the match covers
+            score = (end - start) / len(doc)
+            if score > best_score or (
+                score == best_score and _INTENT_PRIORITY[intent] < _INTENT_PRIORITY[best_intent]
+            ):
+                best_score = score
+                best_intent = intent
 
         # Extract topic regardless of intent
         topic = self.extract_topic(text_lower)
@@ -141,16 +160,18 @@ class IntentClassifier:
 
     def _is_python_related(self, text: str) -> bool:
         """Check if text mentions any Python concept (broad check)."""
-        text_clean = re.sub(r"[^\w\s]", "", text.lower())
+        text_clean = _PUNCT_RE.sub("", text.lower())
         words = set(text_clean.split())
         return bool(words & _PYTHON_KEYWORDS)
 
     def extract_topic(self, text: str) -> str | None:
         """Check if the user mentioned one of the 5 quiz topics."""
         # Strip punctuation for matching, keep spaces
-        text_clean = re.sub(r"[^\w\s]", "", text.lower())
-        for topic, synonyms in _TOPIC_SYNONYMS.items():
-            for synonym in synonyms:
-                if f" {synonym} " in f" {text_clean} " or text_clean.strip() == synonym:
-                    return topic
-        return None
+        words = _PUNCT_RE.sub("", text.lower()).split()
+        best = None
+        for n in range(1, _MAX_TOPIC_PHRASE_WORDS + 1):
+            for i in range(len(words) - n + 1):
+                hit = _TOPIC_PHRASES.get(" ".join(words[i:i + n]))
+                if hit is not None and (best is None or hit < best):
+                    best = hit
+        return best[1] if best else None
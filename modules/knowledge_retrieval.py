@@ -2,11 +2,67 @@
 
 import json
 import random
+import threading
+from collections import OrderedDict
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 import chromadb
 
-from config import EMBEDDING_MODEL, CHROMA_DB_PATH, QUIZ_QUESTIONS_PATH
+from config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_FILE,
+    EMBEDDING_BATCH_SIZE,
+    CHROMA_DB_PATH,
+    QUIZ_QUESTIONS_PATH,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_THRESHOLD,
+)
+from modules.response_cache import ResponseCache
+
+# Random draws tried before falling back to filtering a quiz bucket
+_QUIZ_SAMPLE_ATTEMPTS = 8
+
+
+def _load_embedder(model_name: str) -> SentenceTransformer:
+    """Load the sentence-transformer, preferring the int8 ONNX Runtime backend."""
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            return SentenceTransformer(
+                model_name,
+                backend="onnx",
+                model_kwargs={"file_name": EMBEDDING_ONNX_FILE},
+            )
+        except Exception as e:
+            print(f"ONNX embedding backend unavailable ({e}), falling back to PyTorch.")
+    return SentenceTransformer(model_name)
+
+
+def _pick_unasked(bucket: list[dict], exclude: set[str]) -> dict | None:
+    """Pick a uniformly random question from bucket whose ID isn't excluded.
+
+    A few random draws usually succeed without scanning the bucket; only when
+    most of it has been asked do we filter it.
+    """
+    if not bucket:
+        return None
+    for _ in range(_QUIZ_SAMPLE_ATTEMPTS):
+        q = random.choice(bucket)
+        if q["quiz_id"] not in exclude:
+            return q
+    candidates = [q for q in bucket if q["quiz_id"] not in exclude]
+    return random.choice(candidates) if candidates else None
+
+
+def _normalize_query(text: str) -> str:
+    """Cache key for a query: lowercased, whitespace collapsed, trailing ?!. dropped.
+
+    Other punctuation is kept, since operators and slices ("**", "//", "[::-1]")
+    change what a Python question means.
+    """
+    return " ".join(text.lower().split()).rstrip("?!. ")
 
 
 class KnowledgeBase:
@@ -14,12 +70,24 @@ class KnowledgeBase:
         persist_dir = persist_directory or str(CHROMA_DB_PATH)
         model_name = embedding_model_name or EMBEDDING_MODEL
 
-        self.embedder = SentenceTransformer(model_name)
+        self.embedder = _load_embedder(model_name)
         self.client = chromadb.PersistentClient(path=persist_dir)
 
         # Get or create collections
         self.tutorial_chunks = self.client.get_or_create_collection("tutorial_chunks")
         self.quiz_collection = self.client.get_or_create_collection("quiz_questions")
+        self._collections = {
+            "tutorial_chunks": self.tutorial_chunks,
+            "quiz_questions": self.quiz_collection,
+        }
+        # Document counts per collection, invalidated by add_documents()
+        self._counts: dict[str, int] = {}
+
+        # Query embeddings are cached by normalized text; retrieval results are
+        # additionally reused for near-identical queries.
+        self._embedding_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._embedding_lock = threading.Lock()
+        self._results_cache = ResponseCache(RETRIEVAL_CACHE_THRESHOLD, RETRIEVAL_CACHE_SIZE)
 
         # Load quiz questions from JSON for direct access
         self._quiz_questions = []
@@ -29,17 +97,70 @@ class KnowledgeBase:
         except FileNotFoundError:
             pass
 
+        # Bucket questions once so quiz selection doesn't rescan the full bank
+        self._by_topic_diff: dict[tuple[str, str], list[dict]] = {}
+        self._by_topic: dict[str, list[dict]] = {}
+        for q in self._quiz_questions:
+            self._by_topic_diff.setdefault((q["topic"], q["difficulty"]), []).append(q)
+            self._by_topic.setdefault(q["topic"], []).append(q)
+
     def add_documents(self, collection_name: str, documents: list[str],
                       metadatas: list[dict], ids: list[str]):
         """Embed and upsert documents into the named collection."""
-        collection = self.client.get_or_create_collection(collection_name)
-        embeddings = self.embedder.encode(documents).tolist()
+        collection = self._get_collection(collection_name)
+        embeddings = self.embedder.encode(
+            documents,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            show_progress_bar=True,
+        ).tolist()
         collection.upsert(
             documents=documents,
             embeddings=embeddings,
             metadatas=metadatas,
             ids=ids,
         )
+        self._counts.pop(collection_name, None)
+        self._results_cache.clear()
+
+    def _get_collection(self, collection_name: str):
+        """Return a cached collection handle, creating it on first use."""
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            collection = self.client.get_or_create_collection(collection_name)
+            self._collections[collection_name] = collection
+        return collection
+
+    def _count(self, collection_name: str) -> int:
+        """Return the (cached) number of documents in a collection."""
+        if collection_name not in self._counts:
+            self._counts[collection_name] = self._get_collection(collection_name).count()
+        return self._counts[collection_name]
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Encode a single text into a read-only, unit-normalized vector."""
+        vec = np.asarray(self.embedder.encode([text])[0], dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        vec.setflags(write=False)
+        return vec
+
+    def embed_query(self, query_text: str) -> np.ndarray:
+        """Return the (cached) unit-normalized embedding for a query."""
+        key = _normalize_query(query_text)
+        with self._embedding_lock:
+            vec = self._embedding_cache.get(key)
+            if vec is not None:
+                self._embedding_cache.move_to_end(key)
+                return vec
+        # The key only dedupes; the encoder always sees the original text
+        vec = self._embed(query_text)
+        with self._embedding_lock:
+            self._embedding_cache[key] = vec
+            if len(self._embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+        return vec
 
     def query(self, query_text: str, collection_name: str,
               n_results: int = 3, where_filter: dict = None) -> list[dict]:
@@ -47,18 +168,42 @@ class KnowledgeBase:
 
         Returns list of {"content": str, "metadata": dict, "distance": float}
         """
-        collection = self.client.get_or_create_collection(collection_name)
-        if collection.count() == 0:
+        return self.query_multi(query_text, [(collection_name, n_results, where_filter)])[0]
+
+    def query_multi(self, query_text: str,
+                    specs: list[tuple[str, int, dict | None]]) -> list[list[dict]]:
+        """Embed the query once and run it against several collections.
+
+        Each spec is (collection_name, n_results, where_filter); returns one
+        result list per spec, in the same format as query().
+        """
+        if all(self._count(name) == 0 for name, _, _ in specs):
+            return [[] for _ in specs]
+
+        query_embedding = self.embed_query(query_text)
+        return [self._search(query_embedding, name, n_results, where_filter)
+                for name, n_results, where_filter in specs]
+
+    def _search(self, query_embedding: np.ndarray, collection_name: str,
+                n_results: int, where_filter: dict | None) -> list[dict]:
+        """Search one collection with a precomputed query embedding."""
+        count = self._count(collection_name)
+        if count == 0:
             return []
 
-        query_embedding = self.embedder.encode([query_text]).tolist()
+        cache_kind = f"{collection_name}:{n_results}:{sorted((where_filter or {}).items())}"
+        cached = self._results_cache.get(query_embedding, cache_kind)
+        if cached is not None:
+            return list(cached)
+
         kwargs = {
-            "query_embeddings": query_embedding,
-            "n_results": min(n_results, collection.count()),
+            "query_embeddings": [query_embedding.tolist()],
+            "n_results": min(n_results, count),
         }
         if where_filter:
             kwargs["where"] = where_filter
 
+        collection = self._get_collection(collection_name)
         try:
             results = collection.query(**kwargs)
         except Exception:
@@ -74,33 +219,25 @@ class KnowledgeBase:
                     "metadata": results["metadatas"][0][i] if results.get("metadatas") else {},
                     "distance": results["distances"][0][i] if results.get("distances") else 0.0,
                 })
-        return output
+        self._results_cache.put(query_embedding, cache_kind, output)
+        return list(output)
 
     def get_quiz_question(self, topic: str, difficulty: str,
-                          exclude_ids: list[str] = None) -> dict | None:
+                          exclude_ids: set[str] = None) -> dict | None:
         """Retrieve a quiz question by topic and difficulty from the JSON data.
 
         Uses direct JSON access for reliable metadata matching.
         """
-        exclude = set(exclude_ids or [])
-        candidates = [
-            q for q in self._quiz_questions
-            if q["topic"] == topic
-            and q["difficulty"] == difficulty
-            and q["quiz_id"] not in exclude
-        ]
-        if not candidates:
+        exclude = exclude_ids or set()
+        buckets = (
+            self._by_topic_diff.get((topic, difficulty), []),
             # Try any difficulty for this topic
-            candidates = [
-                q for q in self._quiz_questions
-                if q["topic"] == topic and q["quiz_id"] not in exclude
-            ]
-        if not candidates:
+            self._by_topic.get(topic, []),
             # Try any available question
-            candidates = [
-                q for q in self._quiz_questions
-                if q["quiz_id"] not in exclude
-            ]
-        if not candidates:
-            return None
-        return random.choice(candidates)
+            self._quiz_questions,
+        )
+        for bucket in buckets:
+            question = _pick_unasked(bucket, exclude)
+            if question is not None:
+                return question
+        return None
@@ -1,5 +1,7 @@
 """NLTK-based text preprocessing for the Study Buddy Bot."""
 
+import warnings
+
 import nltk
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
@@ -7,24 +9,41 @@ from nltk.stem import WordNetLemmatizer
 
 
 def initialize():
-    """Download required NLTK data (call once at startup)."""
-    for resource in ["punkt_tab", "stopwords", "wordnet"]:
-        nltk.download(resource, quiet=True)
+    """Deprecated: NLTK data is now downloaded lazily on first use."""
+    warnings.warn(
+        "preprocessor.initialize() is deprecated; NLTK data is downloaded on first use.",
+        DeprecationWarning,
+        stacklevel=2,
+    )
 
 
 _lemmatizer = WordNetLemmatizer()
 _stop_words = None
+_available: set[str] = set()
+
+
+def _ensure_resource(path: str, name: str):
+    """Download an NLTK resource the first time it is needed."""
+    if name in _available:
+        return
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(name, quiet=True)
+    _available.add(name)
 
 
 def _get_stop_words() -> set:
     global _stop_words
     if _stop_words is None:
+        _ensure_resource("corpora/stopwords", "stopwords")
         _stop_words = set(stopwords.words("english"))
     return _stop_words
 
 
 def tokenize(text: str) -> list[str]:
     """Return NLTK word tokens (lowercase)."""
+    _ensure_resource("tokenizers/punkt_tab", "punkt_tab")
     return word_tokenize(text.lower())
 
 
@@ -36,6 +55,7 @@ def remove_stopwords(tokens: list[str]) -> list[str]:
 
 def lemmatize(tokens: list[str]) -> list[str]:
     """Lemmatize each token using WordNetLemmatizer."""
+    _ensure_resource("corpora/wordnet", "wordnet")
     return [_lemmatizer.lemmatize(t) for t in tokens]
 
 
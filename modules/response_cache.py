@@ -0,0 +1,48 @@
+"""In-process semantic cache for retrieval results and generated responses."""
+
+import threading
+
+import numpy as np
+
+
+class ResponseCache:
+    """FIFO cache of responses keyed by unit-normalized embeddings.
+
+    Entries are grouped by ``kind`` so only lookups of the same kind can hit.
+    """
+
+    def __init__(self, threshold: float, max_entries: int):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[np.ndarray, list]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, embedding: np.ndarray, kind: str):
+        """Return the most similar cached response of this kind, or None."""
+        with self._lock:
+            entry = self._entries.get(kind)
+            if entry is None:
+                return None
+            vecs, values = entry
+            sims = vecs @ embedding
+            best = int(np.argmax(sims))
+            if sims[best] > self.threshold:
+                return values[best]
+        return None
+
+    def put(self, embedding: np.ndarray, kind: str, response):
+        """Cache a response, evicting the oldest entry of this kind when full."""
+        with self._lock:
+            vecs, values = self._entries.get(kind, (None, []))
+            row = embedding[np.newaxis, :]
+            vecs = row if vecs is None else np.vstack([vecs, row])
+            values.append(response)
+            if len(values) > self.max_entries:
+                vecs = vecs[1:]
+                del values[0]
+            self._entries[kind] = (vecs, values)
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
@@ -5,44 +5,226 @@ RAG-retrieved content directly for explanations, since small seq2seq models
 excel at classification but struggle with long-form generation.
 """
 
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from difflib import SequenceMatcher
+
+import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 
-from config import HF_MODEL_NAME
+from config import (
+    HF_MODEL_NAME,
+    GENERATOR_BACKEND,
+    GENERATOR_ONNX_DIR,
+    USE_INT8,
+    USE_TORCH_COMPILE,
+    GENERATION_BATCHING,
+    GENERATION_MAX_BATCH,
+    GENERATION_BATCH_WINDOW_MS,
+    ANSWER_FUZZY_MAX_LENGTH,
+    ANSWER_FUZZY_THRESHOLD,
+    ANSWER_SIM_ACCEPT,
+    ANSWER_SIM_REJECT,
+    TOPIC_LABELS,
+)
 
 _model = None
 _tokenizer = None
+_batcher = None
+
+
+def _load_onnx_model():
+    """Load the model on ONNX Runtime, exporting it once to GENERATOR_ONNX_DIR."""
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    exported = GENERATOR_ONNX_DIR.exists()
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        str(GENERATOR_ONNX_DIR) if exported else HF_MODEL_NAME,
+        export=not exported,
+        provider="CPUExecutionProvider",
+        session_options=session_options,
+    )
+    if not exported:
+        model.save_pretrained(GENERATOR_ONNX_DIR)
+    return model
+
+
+def _load_torch_model():
+    """Load the PyTorch model, optionally with INT8 dynamic quantization."""
+    # safetensors weights are memory-mapped; low_cpu_mem_usage skips the
+    # random-init copy, roughly halving peak RSS while loading
+    model = AutoModelForSeq2SeqLM.from_pretrained(
+        HF_MODEL_NAME, use_safetensors=True, low_cpu_mem_usage=True
+    )
+    model.eval()
+    if USE_INT8:
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def _compile_model(model, tokenizer):
+    """torch.compile the model's forward pass and warm it up.
+
+    generate() calls forward once per decoded token, so that is what gets
+    compiled. The warm-up pays the compile cost at load time instead of on
+    the first request; if compilation fails the eager forward is restored.
+    """
+    model.forward = torch.compile(model.forward, mode="default", fullgraph=False)
+    try:
+        inputs = tokenizer("Summarize in one sentence: warm up", return_tensors="pt")
+        with torch.inference_mode():
+            model.generate(**inputs, max_new_tokens=16)
+    except Exception as e:
+        del model.forward
+        print(f"torch.compile failed ({e}), using eager mode.")
 
 
 def _get_model():
     """Lazy-load the HuggingFace model and tokenizer."""
-    global _model, _tokenizer
+    global _model, _tokenizer, _batcher
     if _model is None:
         print(f"Loading HuggingFace model '{HF_MODEL_NAME}'...")
-        _tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_NAME)
-        _model = AutoModelForSeq2SeqLM.from_pretrained(HF_MODEL_NAME)
+        _tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_NAME, use_fast=True)
+        # use_fast=True still falls back to the Python tokenizer when no Rust
+        # one can be built; make that visible instead of silently slower
+        if not _tokenizer.is_fast:
+            print(f"Fast tokenizer unavailable for '{HF_MODEL_NAME}', using the slow Python tokenizer.")
+        if GENERATOR_BACKEND == "onnx":
+            try:
+                _model = _load_onnx_model()
+            except Exception as e:
+                print(f"ONNX Runtime backend unavailable ({e}), falling back to PyTorch.")
+        if _model is None:
+            _model = _load_torch_model()
+            if USE_TORCH_COMPILE and hasattr(torch, "compile"):
+                _compile_model(_model, _tokenizer)
+        # Reuse decoder key/values across steps (O(n) per token instead of O(n^2))
+        _model.config.use_cache = True
+        # Dynamic INT8 picks activation scales per padded batch, so batched
+        # results would depend on their batch-mates (and get memoized that way)
+        if GENERATION_BATCHING and not (USE_INT8 and isinstance(_model, torch.nn.Module)):
+            _batcher = _BatchedGenerator(GENERATION_MAX_BATCH, GENERATION_BATCH_WINDOW_MS / 1000)
         print("Model loaded.")
     return _model, _tokenizer
 
 
-def _generate(prompt: str, max_tokens: int = 64) -> str:
-    """Generate text using the HuggingFace model directly."""
-    try:
-        model, tokenizer = _get_model()
-        inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
+# Anti-repetition settings for free-text generation; they add per-step logits
+# processing, so yes/no classification skips them
+_SUMMARY_KWARGS = {"no_repeat_ngram_size": 3, "repetition_penalty": 1.5}
+
+
+def _generate_batch(prompts: list[str], max_tokens: int, penalize: bool) -> list[str]:
+    """Run one padded generate() call over several prompts."""
+    model, tokenizer = _get_model()
+    inputs = tokenizer(prompts, return_tensors="pt", truncation=True, max_length=512, padding=True)
+    extra_kwargs = _SUMMARY_KWARGS if penalize else {}
+    with torch.inference_mode():
         outputs = model.generate(
             **inputs,
             max_new_tokens=max_tokens,
             do_sample=False,
-            no_repeat_ngram_size=3,
-            repetition_penalty=1.5,
+            num_beams=1,
+            use_cache=True,
+            **extra_kwargs,
         )
-        return tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
+    return [text.strip() for text in tokenizer.batch_decode(outputs, skip_special_tokens=True)]
+
+
+class _BatchedGenerator:
+    """Coalesces concurrent generation requests into batched model calls.
+
+    Callers block in submit() while a worker thread runs queued requests
+    through a single generate() call. A request that arrives alone runs
+    immediately; only when others are already waiting does the worker wait
+    up to window_s for up to max_batch_size of them.
+    """
+
+    def __init__(self, max_batch_size: int, window_s: float):
+        self.max_batch_size = max_batch_size
+        self.window_s = window_s
+        self._queue: queue.Queue = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, prompt: str, max_tokens: int, penalize: bool) -> str:
+        future: Future = Future()
+        self._queue.put((prompt, max_tokens, penalize, future))
+        return future.result()
+
+    def _collect(self) -> list[tuple]:
+        batch = [self._queue.get()]
+        if self._queue.empty():
+            return batch
+        deadline = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            # Requests with different decode settings can't share a generate() call
+            groups: dict[tuple[int, bool], list[tuple[str, Future]]] = {}
+            for prompt, max_tokens, penalize, future in self._collect():
+                groups.setdefault((max_tokens, penalize), []).append((prompt, future))
+            for (max_tokens, penalize), items in groups.items():
+                try:
+                    outputs = _generate_batch([p for p, _ in items], max_tokens, penalize)
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+                else:
+                    for (_, future), output in zip(items, outputs):
+                        future.set_result(output)
+
+
+@functools.lru_cache(maxsize=1024)
+def _run_model(prompt: str, max_tokens: int, penalize: bool) -> str:
+    """Run the model; decoding is greedy, so results are safe to memoize."""
+    _get_model()
+    if _batcher is None:
+        return _generate_batch([prompt], max_tokens, penalize)[0]
+    return _batcher.submit(prompt, max_tokens, penalize)
+
+
+def _generate(prompt: str, max_tokens: int = 64) -> str:
+    """Generate text using the HuggingFace model directly."""
+    try:
+        return _run_model(prompt, max_tokens, True)
+    except Exception as e:
+        return f"An error occurred generating a response: {e}"
+
+
+def _classify(prompt: str) -> str:
+    """Short greedy decode for yes/no questions, without repetition penalties."""
+    try:
+        return _run_model(prompt, 4, False)
     except Exception as e:
         return f"An error occurred generating a response: {e}"
 
 
+def _topic_label(topic: str | None) -> str:
+    """Display name for a topic, precomputed for the quiz topics."""
+    if not topic:
+        return "Python"
+    return TOPIC_LABELS.get(topic) or topic.replace("_", " ").title()
+
+
 class ResponseGenerator:
-    def __init__(self):
+    def __init__(self, embedder=None):
+        # Sentence embedder shared with the KnowledgeBase, used to grade answers
+        # by similarity; without one every ambiguous answer goes to the LLM.
+        self.embedder = embedder
         _get_model()
 
     def generate_explanation(self, topic: str, user_question: str, context_chunks: list[str]) -> str:
@@ -58,10 +240,17 @@ class ResponseGenerator:
                 f"variables, data types, control structures, functions, or lists."
             )
 
-        topic_label = topic.replace("_", " ").title() if topic else "Python"
+        topic_label = _topic_label(topic)
         header = f"**{topic_label}**\n\n"
         body = "\n\n".join(context_chunks[:3])
 
+        # Skip the summary when the first chunk is under 200 chars or its first
+        # 180 chars end exactly on a sentence boundary (the summary prompt would
+        # then mostly restate that opening sentence)
+        first = context_chunks[0]
+        if len(first) < 200 or first[:180].rstrip().endswith((".", "!", "?")):
+            return f"{header}{body}"
+
         # Use the model to generate a brief summary sentence
         summary_prompt = f"Summarize in one sentence: {context_chunks[0][:300]}"
         summary = _generate(summary_prompt, max_tokens=48)
@@ -104,12 +293,14 @@ class ResponseGenerator:
                 masked = correct_answer[:2] + "_" * (len(correct_answer) - 3) + correct_answer[-1]
             return f"**Strong hint:** The answer looks like: `{masked}`"
 
-    def evaluate_answer(self, question: str, correct_answer: str,
-                        student_answer: str, context_chunks: list[str]) -> dict:
-        """Evaluate the student's answer.
+    def match_answer(self, correct_answer: str, student_answer: str,
+                     question_type: str | None = None) -> dict | None:
+        """Cheap string-matching check that needs no model call.
 
-        Uses string matching first, then the LLM for semantic yes/no comparison.
-        Returns: {"is_correct": bool, "explanation": str, "score": float}
+        Returns a correct result for exact, contained or near-identical answers,
+        otherwise None. Typo tolerance only applies to short "short_answer"
+        answers, and code outputs are never accepted by containment ("15"
+        contains "5"), so they must match exactly here.
         """
         answer_lower = student_answer.lower().strip()
         correct_lower = correct_answer.lower().strip()
@@ -117,9 +308,48 @@ class ResponseGenerator:
         if answer_lower == correct_lower:
             return {"is_correct": True, "explanation": "Correct!", "score": 1.0}
 
-        if correct_lower in answer_lower or answer_lower in correct_lower:
+        if (question_type != "code_output"
+                and (correct_lower in answer_lower or answer_lower in correct_lower)):
+            return {"is_correct": True, "explanation": "Correct!", "score": 0.9}
+
+        if (question_type == "short_answer"
+                and len(correct_lower) < ANSWER_FUZZY_MAX_LENGTH
+                and SequenceMatcher(None, answer_lower, correct_lower).ratio() > ANSWER_FUZZY_THRESHOLD):
             return {"is_correct": True, "explanation": "Correct!", "score": 0.9}
 
+        return None
+
+    def evaluate_answer(self, question: str, correct_answer: str,
+                        student_answer: str, context_chunks: list[str],
+                        question_type: str | None = None) -> dict:
+        """Evaluate the student's answer.
+
+        Uses string matching first, then embedding similarity, and only asks the
+        LLM for a semantic yes/no comparison when the similarity is ambiguous.
+        High similarity alone is only accepted for "short_answer" questions.
+        Returns: {"is_correct": bool, "explanation": str, "score": float}
+        """
+        matched = self.match_answer(correct_answer, student_answer, question_type)
+        if matched is not None:
+            return matched
+
+        incorrect = {
+            "is_correct": False,
+            "explanation": f"Not quite. The correct answer was: **{correct_answer}**",
+            "score": 0.0,
+        }
+
+        if self.embedder is not None:
+            embs = self.embedder.encode([correct_answer, student_answer], normalize_embeddings=True)
+            sim = float(embs[0] @ embs[1])
+            # Code outputs and MC options can embed almost identically and still
+            # be wrong ("True True False" vs "False True False"), so only free-text
+            # short answers are accepted on similarity
+            if sim > ANSWER_SIM_ACCEPT and question_type == "short_answer":
+                return {"is_correct": True, "explanation": "Correct!", "score": sim}
+            if sim <= ANSWER_SIM_REJECT:
+                return incorrect
+
         # Use the model for semantic yes/no classification
         prompt = (
             f"Is the student's answer correct? "
@@ -128,19 +358,16 @@ class ResponseGenerator:
             f"Student answer: {student_answer} "
             f"Reply with only 'yes' or 'no'."
         )
-        raw = _generate(prompt, max_tokens=16)
+        raw = _classify(prompt)
         raw_lower = raw.lower()
 
         is_correct = raw_lower.startswith("yes") or "correct" in raw_lower
         if is_correct:
             return {"is_correct": True, "explanation": "Correct!", "score": 0.8}
-        return {
-            "is_correct": False,
-            "explanation": f"Not quite. The correct answer was: **{correct_answer}**",
-            "score": 0.0,
-        }
+        return incorrect
 
-    def generate_greeting(self) -> str:
+    @staticmethod
+    def generate_greeting() -> str:
         """Generate a welcome message."""
         return (
             "Hello! I'm Study Buddy Bot, your Python tutoring assistant.\n\n"
@@ -171,7 +398,7 @@ class ResponseGenerator:
     def format_quiz_question(self, question: dict) -> str:
         """Format a quiz question for display."""
         q_text = question["question"]
-        parts = [f"**{question['difficulty'].title()} - {question['topic'].replace('_', ' ').title()}**\n\n{q_text}"]
+        parts = [f"**{question['difficulty'].title()} - {_topic_label(question['topic'])}**\n\n{q_text}"]
 
         if question.get("question_type") == "multiple_choice" and question.get("options"):
             parts.append("")
@@ -186,8 +413,13 @@ def _looks_degenerate(text: str) -> bool:
     words = text.split()
     if len(words) < 3:
         return False
-    # If more than half the words are the same token, it's degenerate
-    from collections import Counter
-    counts = Counter(words)
-    most_common_count = counts.most_common(1)[0][1]
-    return most_common_count > len(words) * 0.5
+    # If more than half the words are the same token, it's degenerate.
+    # Count in one pass and stop as soon as any token crosses the threshold.
+    threshold = len(words) // 2
+    counts: dict[str, int] = {}
+    for word in words:
+        count = counts.get(word, 0) + 1
+        if count > threshold:
+            return True
+        counts[word] = count
+    return False
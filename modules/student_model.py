@@ -1,6 +1,10 @@
 """Per-session student performance tracking for the Study Buddy Bot."""
 
-from config import TOPICS, DIFFICULTY_LEVELS
+from collections import deque
+
+import numpy as np
+
+from config import TOPICS, TOPIC_LABELS, DIFFICULTY_LEVELS
 
 
 class TopicStats:
@@ -11,7 +15,8 @@ class TopicStats:
         self.correct = 0
         self.current_difficulty = "beginner"
         self.hints_used = 0
-        self.history: list[bool] = []
+        # Only the most recent results are needed for trend analysis
+        self.history: deque[bool] = deque(maxlen=5)
 
     @property
     def accuracy(self) -> float:
@@ -22,7 +27,7 @@ class TopicStats:
     @property
     def last_n(self) -> list[bool]:
         """Return the last 5 results for trend analysis."""
-        return self.history[-5:]
+        return list(self.history)
 
 
 class StudentModel:
@@ -31,13 +36,21 @@ class StudentModel:
         self.session_history: list[dict] = []
         self.current_quiz: dict | None = None
         self.hint_count: int = 0
+        # Per-topic counters mirrored as arrays (indexed like TOPICS) for
+        # vectorized aggregation; TopicStats stays the per-topic API
+        self._topic_index = {t: i for i, t in enumerate(TOPICS)}
+        self._attempted = np.zeros(len(TOPICS), dtype=np.int64)
+        self._correct = np.zeros(len(TOPICS), dtype=np.int64)
 
     def record_answer(self, topic: str, is_correct: bool, difficulty: str, used_hints: int):
         """Record a quiz answer attempt."""
         stats = self.topics[topic]
+        idx = self._topic_index[topic]
         stats.attempted += 1
+        self._attempted[idx] += 1
         if is_correct:
             stats.correct += 1
+            self._correct[idx] += 1
         stats.history.append(is_correct)
         stats.hints_used += used_hints
         self.session_history.append({
@@ -63,17 +76,17 @@ class StudentModel:
 
     def get_weakest_topic(self) -> str | None:
         """Return the topic with the lowest accuracy (min 1 attempt)."""
-        attempted = {t: s for t, s in self.topics.items() if s.attempted > 0}
-        if not attempted:
+        if not self._attempted.any():
             return None
-        return min(attempted, key=lambda t: attempted[t].accuracy)
+        accuracy = self._correct / np.maximum(self._attempted, 1)
+        return TOPICS[int(np.where(self._attempted > 0, accuracy, np.inf).argmin())]
 
     def get_progress_summary(self) -> str:
         """Generate a human-readable progress report."""
         lines = []
         for topic in TOPICS:
             stats = self.topics[topic]
-            name = topic.replace("_", " ").title()
+            name = TOPIC_LABELS[topic]
             if stats.attempted == 0:
                 lines.append(f"  {name}: Not attempted yet")
             else:
@@ -81,8 +94,8 @@ class StudentModel:
                 level = stats.current_difficulty.title()
                 marker = " - Needs review!" if stats.accuracy <= 0.4 and stats.attempted >= 3 else ""
                 lines.append(f"  {name}: {stats.correct}/{stats.attempted} correct ({pct:.0f}%) - {level}{marker}")
-        total_attempted = sum(s.attempted for s in self.topics.values())
-        total_correct = sum(s.correct for s in self.topics.values())
+        total_attempted = int(self._attempted.sum())
+        total_correct = int(self._correct.sum())
         lines.append(f"\n  Overall: {total_correct}/{total_attempted} correct" if total_attempted else "")
         return "\n".join(lines)
 